@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import fnmatch
+import functools
 import logging
+import os
+import re
+import sys
 import threading
+from collections import OrderedDict
 from collections.abc import Generator, Iterable
-from fnmatch import fnmatch
 from pathlib import Path
 from typing import Any, Callable
 
@@ -17,6 +22,63 @@ from watchfiles import Change, watch
 
 P = ParamSpec("P")
 
+_FILTER_CACHE_SIZE = 10_000
+
+_GlobMatcher = Callable[[str], object]
+
+# Offsets where paths relative to each watched ancestor start, and its matcher
+_AncestorGlobs = tuple[tuple[int, _GlobMatcher], ...]
+
+_GLOB_SPECIAL_CHARS = re.compile(r"[*?[]")
+
+
+@functools.cache
+def _compile_globs(patterns: frozenset[str]) -> _GlobMatcher:
+    """
+    Turn a set of globs into a single matcher for relative paths.
+
+    fnmatch.fnmatch() normalizes and looks up the pattern on every call, which
+    adds up when the filter runs for every filesystem event. Globs that are
+    only "*" and a literal suffix, like the common "*.html", are checked with
+    one str.endswith() call. The rest are joined into one compiled regex.
+    """
+    suffixes = []
+    regexes = []
+    for pattern in sorted(patterns):
+        pattern = os.path.normcase(pattern)
+        if pattern.startswith("*") and not _GLOB_SPECIAL_CHARS.search(pattern, 1):
+            suffixes.append(pattern[1:])
+        else:
+            regexes.append(f"(?:{fnmatch.translate(pattern)})")
+
+    suffix_tuple = tuple(suffixes)
+    if not regexes:
+        return lambda path: path.endswith(suffix_tuple)
+    regex_match = re.compile("|".join(regexes)).match
+    if not suffixes:
+        return regex_match
+    return lambda path: path.endswith(suffix_tuple) or regex_match(path)
+
+
+def _resolution_keys(path: Path | str, link_paths: set[str]) -> tuple[str, str]:
+    """
+    Return the normalized given and real locations of a watched path.
+
+    When they differ, the path and its parents are added to link_paths, since
+    deleting any of them can change where the path resolves to.
+    """
+    given = os.path.normcase(path)
+    resolved = os.path.normcase(os.path.realpath(path))
+    if resolved != given:
+        link_path = given
+        while link_path not in link_paths:
+            link_paths.add(link_path)
+            parent = os.path.dirname(link_path)
+            if parent == link_path:
+                break
+            link_path = parent
+    return given, resolved
+
 
 class MutableWatcher:
     """
@@ -33,12 +95,17 @@ class MutableWatcher:
         self.change_event = threading.Event()
         self.stop_event = threading.Event()
         self.roots: set[Path] = set()
+        self._resolved_roots: frozenset[str] = frozenset()
         self.filter = filter
         self.watchfiles_settings = watchfiles_settings
 
     def set_roots(self, roots: set[Path]) -> None:
-        if roots != self.roots:
+        # Compare resolved strings rather than Path objects, which are slower
+        # to hash and treat symlinked aliases of a root as different roots.
+        resolved_roots = frozenset(sys.intern(os.path.realpath(r)) for r in roots)
+        if resolved_roots != self._resolved_roots:
             self.roots = roots
+            self._resolved_roots = resolved_roots
             self.change_event.set()
 
     def stop(self) -> None:
@@ -52,7 +119,10 @@ class MutableWatcher:
             watch_kwargs = {
                 "watch_filter": self.filter,
                 "stop_event": self.stop_event,
-                "debounce": False,
+                # Let watchfiles group bursts of events into one batch, checking
+                # every 50ms for up to 100ms.
+                "debounce": 100,
+                "step": 50,
                 "rust_timeout": 100,
                 "yield_on_timeout": True,
                 **self.watchfiles_settings,
@@ -68,24 +138,128 @@ class WatchfilesReloader(autoreload.BaseReloader):
     def __init__(self, watchfiles_settings: dict[str, Any]) -> None:
         self.watchfiles_settings = watchfiles_settings
         self.watcher = MutableWatcher(self.file_filter, watchfiles_settings)
-        self.watched_files_set: set[Path] = set()
+        self._filter_cache: OrderedDict[tuple[Change, str], bool] = OrderedDict()
+        self._watched_files_set: frozenset[Path] = frozenset()
+        self._watched_file_strs: frozenset[str] = frozenset()
+        self._dir_globs: dict[str, _GlobMatcher] = {}
+        self._link_paths: frozenset[str] = frozenset()
+        self._ancestor_globs: OrderedDict[str, _AncestorGlobs] = OrderedDict()
         super().__init__()
 
+    @property
+    def watched_files_set(self) -> frozenset[Path]:
+        return self._watched_files_set
+
+    @watched_files_set.setter
+    def watched_files_set(self, value: Iterable[Path]) -> None:
+        # Frozen, since file_filter() works from the strings resolved here and
+        # would not see files added to the set in place.
+        self._watched_files_set = frozenset(value)
+        self._resolve_watched()
+
+    def _invalidate_filter_cache(self) -> None:
+        self._filter_cache.clear()
+
+    def watch_dir(self, path: Path | str, glob: str) -> None:
+        # Normalize without touching the filesystem, the directory may not
+        # exist yet. If the working directory is gone, BaseReloader logs it.
+        try:
+            path = os.path.abspath(path)
+        except FileNotFoundError:  # pragma: no cover
+            pass
+        # Apps tend to register the same few globs, interning them lets the
+        # compiled glob cache compare keys by identity.
+        super().watch_dir(path, sys.intern(glob))
+        self._resolve_watched()
+
+    def _resolve_watched(self) -> None:
+        # Watched files and directories are resolved here rather than for
+        # every event, and keyed under both their given and real locations, so
+        # events reported at either hit with string lookups.
+        link_paths: set[str] = set()
+        file_strs: set[str] = set()
+        for path in self._watched_files_set:
+            file_strs.update(_resolution_keys(path, link_paths))
+        dir_globs: dict[str, set[str]] = {}
+        for directory, globs in self.directory_globs.items():
+            for key in _resolution_keys(directory, link_paths):
+                dir_globs.setdefault(key, set()).update(globs)
+
+        self._watched_file_strs = frozenset(file_strs)
+        self._dir_globs = {
+            directory: _compile_globs(frozenset(globs))
+            for directory, globs in dir_globs.items()
+        }
+        self._link_paths = frozenset(link_paths)
+        self._ancestor_globs.clear()
+        self._invalidate_filter_cache()
+
     def file_filter(self, change: Change, filename: str) -> bool:
-        path = Path(filename)
-        if path in self.watched_files_set:
+        if change is Change.deleted and os.path.normcase(filename) in self._link_paths:
+            # A deleted symlink, or a directory above one, may come back
+            # pointing elsewhere. Every event passes through here, including
+            # ones this filter rejects, so this is the place to notice.
+            self._resolve_watched()
+
+        # The same paths come up again and again while watching, so remember
+        # the most recent results rather than re-running the glob matching.
+        key = (change, filename)
+        try:
+            result = self._filter_cache[key]
+        except KeyError:
+            pass
+        else:
+            self._filter_cache.move_to_end(key)
+            return result
+
+        result = self._match(filename)
+        self._filter_cache[key] = result
+        if len(self._filter_cache) > _FILTER_CACHE_SIZE:
+            self._filter_cache.popitem(last=False)
+        return result
+
+    def _match(self, filename: str) -> bool:
+        # Work on plain strings here, building Path objects for every event
+        # is comparatively expensive.
+        filename = os.path.normcase(filename)
+        if filename in self._watched_file_strs:
             return True
-        for directory, globs in self.directory_globs.items():
-            try:
-                relative_path = path.relative_to(directory)
-            except ValueError:
-                pass
-            else:
-                relative_path_str = str(relative_path)
-                for glob in globs:
-                    if fnmatch(relative_path_str, glob):
-                        return True
-        return False
+        directory = os.path.dirname(filename)
+        try:
+            ancestor_globs = self._ancestor_globs[directory]
+        except KeyError:
+            ancestor_globs = self._find_globs_above(directory)
+            self._ancestor_globs[directory] = ancestor_globs
+            # Events can come from anywhere under the roots, like .git or
+            # node_modules, so keep only the most recent directories.
+            if len(self._ancestor_globs) > _FILTER_CACHE_SIZE:
+                self._ancestor_globs.popitem(last=False)
+        else:
+            self._ancestor_globs.move_to_end(directory)
+        return any(match(filename[start:]) for start, match in ancestor_globs)
+
+    def _find_globs_above(self, directory: str) -> _AncestorGlobs:
+        """
+        Find the glob matchers of the watched directories containing directory.
+
+        Returns pairs of the offset where paths relative to each watched
+        directory start, and its matcher. Events usually arrive for many files
+        in the same few directories, so the result is cached per directory.
+        """
+        # Only directories containing the path can match, so look those up
+        # instead of trying every watched directory.
+        found = []
+        while True:
+            match = self._dir_globs.get(directory)
+            if match:
+                start = len(directory)
+                if not directory.endswith(os.sep):
+                    start += 1
+                found.append((start, match))
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return tuple(found)
+            directory = parent
 
     def watched_roots(self, watched_files: Iterable[Path]) -> frozenset[Path]:
         # Adapted from WatchmanReloader
@@ -97,7 +271,7 @@ class WatchfilesReloader(autoreload.BaseReloader):
         return frozenset(existing_dirs)
 
     def tick(self) -> Generator[None]:
-        self.watched_files_set = set(self.watched_files(include_globs=False))
+        self.watched_files_set = self.watched_files(include_globs=False)
         roots = set(
             autoreload.common_roots(
                 self.watched_roots(self.watched_files_set),
@@ -116,19 +290,25 @@ def replaced_run_with_reloader(
 ) -> int | None:
     try:
         watchfiles_settings = getattr(settings, "WATCHFILES", {}).copy()
-    except (ImproperlyConfigured, AttributeError):  # pragma: no cover
-        watchfiles_settings = {}  # pragma: no cover
+    except (ImproperlyConfigured, AttributeError):
+        watchfiles_settings = {}
 
     if "watch_filter" in watchfiles_settings:
         try:
-            watchfiles_settings["watch_filter"] = import_string(
-                watchfiles_settings["watch_filter"]
-            )()
-        except (AttributeError, ValueError) as exc:  # pragma: no cover
-            logging.warning(  # pragma: no cover
+            filter_factory = import_string(watchfiles_settings["watch_filter"])
+        except (AttributeError, ImportError, ValueError) as exc:
+            logging.warning(
                 f"Failed to import watch_filter '{watchfiles_settings['watch_filter']}': {exc}"
             )
-            watchfiles_settings.pop("watch_filter")  # pragma: no cover
+            watchfiles_settings.pop("watch_filter")
+        else:
+            if callable(filter_factory):
+                watchfiles_settings["watch_filter"] = filter_factory()
+            else:
+                logging.warning(
+                    f"watch_filter '{watchfiles_settings['watch_filter']}' is not callable"
+                )
+                watchfiles_settings.pop("watch_filter")
 
     settings_verbosity = watchfiles_settings.pop("verbosity", None)
 
@@ -1,14 +1,36 @@
+from __future__ import annotations
+
+from typing import Callable
+
 from watchfiles import Change
 
+NOT_CALLABLE = "not a filter factory"
+
 
 def only_added(change: Change, path: str) -> bool:
-    return change == Change.added
+    # Change members are singletons, an identity check skips Enum.__eq__
+    return change is Change.added
+
+
+def make_mask_filter(*changes: Change) -> Callable[[Change, str], bool]:
+    """Build a filter accepting only the given change types"""
+    # Change is an IntEnum, so the accepted types pack into one bitmask and
+    # each event is checked with a shift and an AND, with no set lookup.
+    mask = 0
+    for change in changes:
+        mask |= 1 << change
+
+    def mask_filter(change: Change, path: str) -> bool:
+        return bool(mask >> change & 1)
+
+    return mask_filter
 
 
 def only_added_factory():
     """Factory function that returns the filter function"""
+    return make_mask_filter(Change.added)
 
-    def only_added(change: Change, path: str) -> bool:
-        return change == Change.added
 
-    return only_added
+def raising_factory():
+    """Factory function that fails while building the filter"""
+    raise TypeError("broken filter factory")
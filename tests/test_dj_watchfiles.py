@@ -1,35 +1,122 @@
 from __future__ import annotations
 
 import logging
+import os
+import shutil
+import sys
 import tempfile
 import time
+import types
 from pathlib import Path
 from unittest import mock
 
 import pytest
 from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
 from django.utils import autoreload
 from django.utils.autoreload import BaseReloader
-from parameterized import parameterized
 from watchfiles import Change
 
 from dj_watchfiles.watch import (
     MutableWatcher,
     WatchfilesReloader,
+    _compile_globs,
     replaced_run_with_reloader,
 )
 from tests.compat import SimpleTestCase
-from tests.filters import only_added
+from tests.filters import make_mask_filter, only_added
+
+temp_root: Path
+
+
+def setUpModule():
+    # Tests make their directories under one root, removed in one go at the
+    # end rather than one by one after each test.
+    global temp_root
+    temp_root = Path(tempfile.mkdtemp())
+
+
+def tearDownModule():
+    shutil.rmtree(temp_root, ignore_errors=True)
+
+
+def make_temp_dir() -> Path:
+    return Path(tempfile.mkdtemp(dir=temp_root))
+
+
+def write_file(path, content):
+    """
+    Write and fsync a file with one unbuffered write.
+
+    The data is on disk before the test goes on to wait for its events.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    try:
+        os.write(fd, content.encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def flush_initial_events(watcher_iter):
+    """
+    Consume batches up to the first empty one.
+
+    The watch is in place once the first batch arrives, and the empty batch
+    means anything from before the test started has been delivered.
+    """
+    while next(watcher_iter):
+        pass
+
+
+def wait_for_changes(watcher_iter, timeout=6.0):
+    """
+    Wait for the next non-empty batch of changes, or None on timeout.
+
+    next() already blocks in watchfiles until changes arrive or its
+    rust_timeout passes, so there is no need to sleep between calls.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        changes = next(watcher_iter, None)
+        if changes is None or changes:
+            return changes
+    return None
+
+
+def wait_for_change(watcher_iter, change, timeout=6.0):
+    """
+    Wait for a batch containing the given change, or None on timeout.
+
+    Batches without it, like late events from an earlier write, are skipped.
+    """
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        changes = wait_for_changes(watcher_iter, remaining)
+        if changes is None or change in changes:
+            return changes
+    return None
 
 
 class MutableWatcherTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.shared_temp_path = make_temp_dir()
+        cls.resolved_temp_path = str(cls.shared_temp_path.resolve())
+
     def setUp(self):
         self.watchfiles_settings = {}
         self.watcher = MutableWatcher(lambda *args: True, self.watchfiles_settings)
         self.addCleanup(self.watcher.stop)
 
-        temp_dir = self.enterContext(tempfile.TemporaryDirectory())
-        self.temp_path = Path(temp_dir)
+        # Reuse one directory for the class, emptied before each test
+        self.temp_path = self.shared_temp_path
+        for path in self.temp_path.iterdir():
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
 
     def test_set_roots_unchanged(self):
         assert not self.watcher.change_event.is_set()
@@ -41,12 +128,21 @@ class MutableWatcherTests(SimpleTestCase):
         self.watcher.set_roots({Path("/tmp")})
         assert self.watcher.change_event.is_set()
 
+    def test_set_roots_symlinked_alias_unchanged(self):
+        link_path = self.temp_path / "link"
+        link_path.symlink_to(self.temp_path)
+        self.watcher.set_roots({self.temp_path})
+        self.watcher.change_event.clear()
+
+        self.watcher.set_roots({link_path})
+
+        assert not self.watcher.change_event.is_set()
+
     def test_stop(self):
         (self.temp_path / "test.txt").touch()
         self.watcher.set_roots({self.temp_path})
         iterator = iter(self.watcher)
-        # Flush initial events
-        next(iterator)
+        flush_initial_events(iterator)
 
         self.watcher.stop()
 
@@ -57,50 +153,44 @@ class MutableWatcherTests(SimpleTestCase):
         with pytest.raises(StopIteration):
             next(iter(self.watcher))
 
-    @pytest.mark.flaky(reruns=3, reruns_delay=1)
     def test_iter_no_changes(self):
+        # Only the timeout batches matter here, so don't wait long for them
+        self.watchfiles_settings["rust_timeout"] = 10
         test_file = self.temp_path / "test.txt"
-        test_file.write_text("initial content")
+        write_file(test_file, "initial content")
 
         self.watcher.set_roots({self.temp_path})
         iterator = iter(self.watcher)
 
-        # Flush initial events
-        next(iterator)
-        time.sleep(0.5)
+        flush_initial_events(iterator)
         changes = next(iterator)
 
         assert changes == set(), f"Expected empty set, got changes: {changes}"
 
-    @pytest.mark.flaky(reruns=3, reruns_delay=1)
     def test_iter_yields_changes(self):
         test_file = self.temp_path / "test.txt"
-        test_file.write_text("initial content")
+        write_file(test_file, "initial content")
 
         self.watcher.set_roots({self.temp_path})
         iterator = iter(self.watcher)
 
-        # Flush initial events
-        next(iterator)
-        time.sleep(0.5)
+        flush_initial_events(iterator)
 
-        test_file.write_text("modified content")
-        time.sleep(0.5)
-        changes = next(iterator)
+        write_file(test_file, "modified content")
+        changes = wait_for_changes(iterator)
 
         assert isinstance(changes, set)
         assert (
             len(changes) == 1
         ), f"Expected 1 change, got {len(changes)} changes: {changes}"
         change, path = changes.pop()
-        assert path == str(test_file.resolve())
+        assert path == os.path.join(self.resolved_temp_path, "test.txt")
 
     def test_iter_respects_change_event(self):
         (self.temp_path / "test.txt").touch()
         self.watcher.set_roots({self.temp_path})
         iterator = iter(self.watcher)
-        # flush initial events
-        next(iterator)
+        flush_initial_events(iterator)
 
         self.watcher.set_roots(set())
         self.watcher.set_roots({self.temp_path})
@@ -112,8 +202,7 @@ class MutableWatcherTests(SimpleTestCase):
 
 class WatchfilesReloaderTests(SimpleTestCase):
     def setUp(self):
-        temp_dir = self.enterContext(tempfile.TemporaryDirectory())
-        self.temp_path = Path(temp_dir)
+        self.temp_path = make_temp_dir()
         self.watchfiles_settings = {}
         self.reloader = WatchfilesReloader(self.watchfiles_settings)
 
@@ -125,6 +214,62 @@ class WatchfilesReloaderTests(SimpleTestCase):
 
         assert result is True
 
+    def test_file_filter_watched_file_through_symlink(self):
+        link_path = self.temp_path / "link"
+        link_path.symlink_to(self.temp_path)
+        self.reloader.watched_files_set = {link_path / "test.txt"}
+
+        result = self.reloader.file_filter(
+            Change.modified, str(self.temp_path.resolve() / "test.txt")
+        )
+
+        assert result is True
+
+    def test_watched_files_set_is_frozen(self):
+        self.reloader.watched_files_set = {self.temp_path / "test.txt"}
+
+        assert isinstance(self.reloader.watched_files_set, frozenset)
+        with pytest.raises(AttributeError):
+            self.reloader.watched_files_set.add(self.temp_path / "other.txt")
+
+    def test_file_filter_cache_invalidated_by_watched_files_set(self):
+        test_txt = self.temp_path / "test.txt"
+        assert self.reloader.file_filter(Change.modified, str(test_txt)) is False
+
+        self.reloader.watched_files_set = {test_txt}
+
+        assert self.reloader.file_filter(Change.modified, str(test_txt)) is True
+
+    def test_file_filter_cache_invalidated_by_watch_dir(self):
+        test_txt = self.temp_path / "test.txt"
+        assert self.reloader.file_filter(Change.modified, str(test_txt)) is False
+
+        self.reloader.watch_dir(self.temp_path, "*.txt")
+
+        assert self.reloader.file_filter(Change.modified, str(test_txt)) is True
+
+    def test_file_filter_cache_bounded(self):
+        with mock.patch("dj_watchfiles.watch._FILTER_CACHE_SIZE", 2):
+            for name in ("a.txt", "b.txt", "c.txt"):
+                self.reloader.file_filter(Change.modified, str(self.temp_path / name))
+
+        assert list(self.reloader._filter_cache) == [
+            (Change.modified, str(self.temp_path / "b.txt")),
+            (Change.modified, str(self.temp_path / "c.txt")),
+        ]
+
+    def test_file_filter_ancestor_globs_bounded(self):
+        with mock.patch("dj_watchfiles.watch._FILTER_CACHE_SIZE", 2):
+            for name in ("a", "b", "c"):
+                self.reloader.file_filter(
+                    Change.modified, str(self.temp_path / name / "test.txt")
+                )
+
+        assert list(self.reloader._ancestor_globs) == [
+            os.path.normcase(str(self.temp_path / "b")),
+            os.path.normcase(str(self.temp_path / "c")),
+        ]
+
     def test_file_filter_unwatched_file(self):
         test_txt = self.temp_path / "test.txt"
 
@@ -141,6 +286,78 @@ class WatchfilesReloaderTests(SimpleTestCase):
 
         assert result is True
 
+    def test_file_filter_glob_compiled_once(self):
+        _compile_globs.cache_clear()
+        self.reloader.watch_dir(self.temp_path, "*.txt")
+
+        for name in ("a.txt", "b.txt", "c.txt"):
+            assert self.reloader.file_filter(
+                Change.modified, str(self.temp_path / name)
+            )
+
+        assert _compile_globs.cache_info().misses == 1
+
+    def test_file_filter_globs_shared_between_directories(self):
+        temp_dir2 = make_temp_dir()
+        _compile_globs.cache_clear()
+
+        self.reloader.watch_dir(self.temp_path, "*.txt")
+        self.reloader.watch_dir(temp_dir2, "*.txt")
+
+        assert _compile_globs.cache_info().misses == 1
+        assert self.reloader.file_filter(Change.modified, str(temp_dir2 / "a.txt"))
+
+    def test_file_filter_glob_matched_with_parent_reference(self):
+        self.reloader.watch_dir(self.temp_path / "sub" / "..", "*.txt")
+
+        result = self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "test.txt")
+        )
+
+        assert result is True
+
+    def test_watch_dir_interns_glob(self):
+        glob = "".join(["*.", "txt"])
+
+        self.reloader.watch_dir(self.temp_path, glob)
+
+        (stored,) = self.reloader.directory_globs[self.temp_path]
+        assert stored is sys.intern("*.txt")
+
+    def test_file_filter_glob_matched_at_symlink_target(self):
+        real_dir = self.temp_path / "real"
+        real_dir.mkdir()
+        link_dir = self.temp_path / "link"
+        link_dir.symlink_to(real_dir)
+        self.reloader.watch_dir(link_dir, "*.txt")
+
+        result = self.reloader.file_filter(
+            Change.modified, str(real_dir.resolve() / "test.txt")
+        )
+
+        assert result is True
+
+    def test_file_filter_glob_symlink_alias_unmatched(self):
+        # Event paths are not resolved, only the watched directories are
+        real_dir = self.temp_path / "real"
+        real_dir.mkdir()
+        link_dir = self.temp_path / "link"
+        link_dir.symlink_to(real_dir)
+        self.reloader.watch_dir(real_dir, "*.txt")
+
+        result = self.reloader.file_filter(Change.modified, str(link_dir / "test.txt"))
+
+        assert result is False
+
+    def test_file_filter_glob_matched_in_subdirectory(self):
+        self.reloader.watch_dir(self.temp_path, "**/*.txt")
+
+        result = self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "sub" / "test.txt")
+        )
+
+        assert result is True
+
     def test_file_filter_glob_multiple_globs_unmatched(self):
         self.reloader.watch_dir(self.temp_path, "*.css")
         self.reloader.watch_dir(self.temp_path, "*.html")
@@ -151,10 +368,44 @@ class WatchfilesReloaderTests(SimpleTestCase):
 
         assert result is False
 
+    def test_file_filter_glob_multiple_globs_matched(self):
+        self.reloader.watch_dir(self.temp_path, "*.css")
+        self.reloader.watch_dir(self.temp_path, "*.html")
+
+        result = self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "test.html")
+        )
+
+        assert result is True
+
+    def test_file_filter_glob_suffix_and_pattern_mixed(self):
+        self.reloader.watch_dir(self.temp_path, "*.css")
+        self.reloader.watch_dir(self.temp_path, "test_?.py")
+
+        assert self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "site.css")
+        )
+        assert self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "test_a.py")
+        )
+        assert not self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "test_ab.py")
+        )
+
+    def test_file_filter_glob_any_extension(self):
+        self.reloader.watch_dir(self.temp_path, "*.*")
+
+        assert self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "test.txt")
+        )
+        assert not self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "Makefile")
+        )
+
     def test_file_filter_glob_multiple_dirs_unmatched(self):
         self.reloader.watch_dir(self.temp_path, "*.css")
-        temp_dir2 = self.enterContext(tempfile.TemporaryDirectory())
-        self.reloader.watch_dir(Path(temp_dir2), "*.html")
+        temp_dir2 = make_temp_dir()
+        self.reloader.watch_dir(temp_dir2, "*.html")
 
         result = self.reloader.file_filter(
             Change.modified, str(self.temp_path / "test.py")
@@ -163,9 +414,9 @@ class WatchfilesReloaderTests(SimpleTestCase):
         assert result is False
 
     def test_file_filter_glob_relative_path_impossible(self):
-        temp_dir2 = self.enterContext(tempfile.TemporaryDirectory())
+        temp_dir2 = make_temp_dir()
 
-        self.reloader.watch_dir(Path(temp_dir2), "*.txt")
+        self.reloader.watch_dir(temp_dir2, "*.txt")
 
         result = self.reloader.file_filter(
             Change.modified, str(self.temp_path / "test.txt")
@@ -173,6 +424,15 @@ class WatchfilesReloaderTests(SimpleTestCase):
 
         assert result is False
 
+    def test_file_filter_glob_sibling_with_same_prefix(self):
+        self.reloader.watch_dir(self.temp_path / "src", "*.txt")
+
+        result = self.reloader.file_filter(
+            Change.modified, str(self.temp_path / "src_other" / "test.txt")
+        )
+
+        assert result is False
+
     def test_tick(self):
         test_txt = self.temp_path / "test.txt"
         self.reloader.extra_files = {test_txt}
@@ -184,6 +444,62 @@ class WatchfilesReloaderTests(SimpleTestCase):
         result = self.reloader.file_filter(Change.modified, str(test_txt))
         assert result is True
 
+    def test_tick_resolves_watched_dirs_again(self):
+        for name in ("a", "b"):
+            (self.temp_path / name).mkdir()
+        link_dir = self.temp_path / "link"
+        link_dir.symlink_to(self.temp_path / "a")
+        self.reloader.watch_dir(link_dir, "*.txt")
+        a_txt = str(self.temp_path.resolve() / "a" / "test.txt")
+        assert self.reloader.file_filter(Change.modified, a_txt) is True
+
+        link_dir.unlink()
+        link_dir.symlink_to(self.temp_path / "b")
+        with mock.patch.object(MutableWatcher, "__iter__", return_value=iter([])):
+            list(self.reloader.tick())
+
+        assert self.reloader.file_filter(Change.modified, a_txt) is False
+
+    def test_file_filter_symlink_deletion_resolves_again(self):
+        for name in ("a", "b"):
+            (self.temp_path / name).mkdir()
+        link_dir = self.temp_path / "link"
+        link_dir.symlink_to(self.temp_path / "a")
+        self.reloader.watch_dir(link_dir, "*.txt")
+        self.reloader.watch_dir(self.temp_path, "*.flag")
+        resolved_temp_path = self.temp_path.resolve()
+        a_txt = str(resolved_temp_path / "a" / "test.txt")
+        b_txt = str(resolved_temp_path / "b" / "test.txt")
+        assert self.reloader.file_filter(Change.modified, a_txt) is True
+
+        watcher = self.reloader.watcher
+        self.addCleanup(watcher.stop)
+        watcher.set_roots({self.temp_path})
+        iterator = iter(watcher)
+        flush_initial_events(iterator)
+
+        # The filter rejects the link's own events, but has to notice them
+        link_dir.unlink()
+        link_dir.symlink_to(self.temp_path / "b")
+        flag_path = str(resolved_temp_path / "done.flag")
+        write_file(flag_path, "")
+        changes = wait_for_changes(iterator)
+        while changes and (Change.added, flag_path) not in changes:
+            changes = wait_for_changes(iterator)
+
+        assert changes, "No event for the flag file"
+        assert self.reloader.file_filter(Change.modified, a_txt) is False
+        assert self.reloader.file_filter(Change.modified, b_txt) is True
+
+    def test_file_filter_unlinked_deletion_keeps_cache(self):
+        self.reloader.watch_dir(self.temp_path, "*.txt")
+        test_txt = str(self.temp_path / "test.txt")
+        self.reloader.file_filter(Change.modified, test_txt)
+
+        self.reloader.file_filter(Change.deleted, test_txt)
+
+        assert (Change.modified, test_txt) in self.reloader._filter_cache
+
     def test_tick_non_existent_directory_watched(self):
         does_not_exist = self.temp_path / "nope"
         self.reloader.watch_dir(does_not_exist, "*.txt")
@@ -192,33 +508,78 @@ class WatchfilesReloaderTests(SimpleTestCase):
         result = next(iterator)
         assert result is None
 
+    def test_tick_merges_watched_dirs_into_common_root(self):
+        for name in ("a", "b"):
+            (self.temp_path / name).mkdir()
+            self.reloader.watch_dir(self.temp_path / name, "*.txt")
+        self.reloader.watch_dir(self.temp_path, "*.py")
 
-class ReplacedRunWithReloaderTests(SimpleTestCase):
-    def setUp(self):
-        self.original_run_with_reloader = autoreload.run_with_reloader
-        self.original_tick = WatchfilesReloader.tick
+        iterator = self.reloader.tick()
+        next(iterator)
 
-        self.exit_patcher = mock.patch("sys.exit")
-        self.mock_exit = self.exit_patcher.start()
+        roots = self.reloader.watcher.roots
+        assert self.temp_path in roots
+        assert self.temp_path / "a" not in roots
+        assert self.temp_path / "b" not in roots
+
+
+@pytest.fixture(scope="class")
+def reloader_env():
+    """Run replaced_run_with_reloader() without starting a real reloader"""
+
+    def mock_run_with_reloader(main_func, *args, **kwargs):
+        return main_func(*args, **kwargs)
+
+    def mock_tick(self):
+        yield None
+
+    with (
+        mock.patch("sys.exit"),
+        mock.patch.object(autoreload, "run_with_reloader", mock_run_with_reloader),
+        mock.patch("dj_watchfiles.watch.run_with_reloader", mock_run_with_reloader),
+        mock.patch.object(WatchfilesReloader, "tick", mock_tick),
+    ):
+        yield
+
+
+def settings_with_watchfiles(watchfiles):
+    return types.SimpleNamespace(WATCHFILES=watchfiles)
+
+
+def settings_without_watchfiles():
+    return types.SimpleNamespace()
+
+
+def unconfigured_settings():
+    # Raising on attribute access needs a property, so this one stays a Mock
+    mock_settings = mock.Mock()
+    type(mock_settings).WATCHFILES = mock.PropertyMock(
+        side_effect=ImproperlyConfigured("Settings not configured")
+    )
+    return mock_settings
 
-        def mock_run_with_reloader(main_func, *args, **kwargs):
-            return main_func(*args, **kwargs)
 
-        def mock_tick(self):
-            # Return an empty iterator that doesn't start the watcher
-            yield None
+@pytest.fixture
+def watchfiles_logger():
+    # replaced_run_with_reloader() sets this logger's level, put it back after
+    logger = logging.getLogger("watchfiles")
+    level = logger.level
+    yield logger
+    logger.setLevel(level)
 
-        self.mock_run_with_reloader = mock_run_with_reloader
-        autoreload.run_with_reloader = self.mock_run_with_reloader
-        WatchfilesReloader.tick = mock_tick
 
-    def tearDown(self):
-        autoreload.run_with_reloader = self.original_run_with_reloader
-        WatchfilesReloader.tick = self.original_tick
-        self.exit_patcher.stop()
+@pytest.fixture
+def patched_settings(request):
+    # replaced_run_with_reloader() reads the settings it imported, so that is
+    # what needs replacing, not django.conf.settings.
+    with mock.patch("dj_watchfiles.watch.settings", request.param) as settings:
+        yield settings
 
+
+@pytest.mark.usefixtures("reloader_env", "watchfiles_logger")
+class TestReplacedRunWithReloader:
     def test_replaced_run_with_reloader_default_settings(self):
-        with self.settings(WATCHFILES={}):
+        with override_settings(WATCHFILES={}):
             replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
             reloader = autoreload.get_reloader()
             assert isinstance(reloader, WatchfilesReloader)
@@ -233,39 +594,20 @@ class ReplacedRunWithReloaderTests(SimpleTestCase):
             "debug": True,
         }
 
-        with self.settings(WATCHFILES=custom_settings):
+        with override_settings(WATCHFILES=custom_settings):
             replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
             reloader = autoreload.get_reloader()
             assert isinstance(reloader, WatchfilesReloader)
             assert reloader.watchfiles_settings["debug"] is True
             assert callable(reloader.watchfiles_settings["watch_filter"])
 
-    @parameterized.expand(
-        [
-            ("error_level", 0, logging.ERROR),
-            ("warning_level", 1, logging.WARNING),
-            ("info_level", 2, logging.INFO),
-            ("debug_level", 3, logging.DEBUG),
-        ]
-    )
-    def test_replaced_run_with_reloader_verbosity(
-        self, name, verbosity, expected_level
-    ):
-        with self.settings(WATCHFILES={}):
-            replaced_run_with_reloader(
-                lambda *args, **kwargs: None, verbosity=verbosity
-            )
-            watchfiles_logger = logging.getLogger("watchfiles")
-            assert watchfiles_logger.level == expected_level
-
-    def test_replaced_run_with_reloader_with_watch_filter(self):
+    def test_replaced_run_with_reloader_with_watch_filter(self, watchfiles_logger):
         filter_path = "tests.filters.only_added_factory"
         custom_settings = {"watch_filter": filter_path, "debug": True}
 
-        with self.settings(WATCHFILES=custom_settings):
+        with override_settings(WATCHFILES=custom_settings):
             replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
 
-            watchfiles_logger = logging.getLogger("watchfiles")
             assert watchfiles_logger.level == logging.DEBUG
 
             reloader = autoreload.get_reloader()
@@ -277,290 +619,210 @@ class ReplacedRunWithReloaderTests(SimpleTestCase):
             assert filter_func(Change.added, "test.py")
             assert not filter_func(Change.modified, "test.py")
 
-    @parameterized.expand(
+    @pytest.mark.parametrize(
+        ("verbosity", "expected_level"),
         [
-            ("error_level", 0, logging.ERROR),
-            ("warning_level", 1, logging.WARNING),
-            ("info_level", 2, logging.INFO),
-            ("debug_level", 3, logging.DEBUG),
-        ]
+            pytest.param(0, logging.ERROR, id="error_level"),
+            pytest.param(1, logging.WARNING, id="warning_level"),
+            pytest.param(2, logging.INFO, id="info_level"),
+            pytest.param(3, logging.DEBUG, id="debug_level"),
+        ],
     )
-    def test_replaced_run_with_reloader_no_debug(self, name, verbosity, expected_level):
-        """Test the log level calculation without debug mode"""
-        with self.settings(WATCHFILES={}):
+    def test_replaced_run_with_reloader_verbosity(
+        self, watchfiles_logger, verbosity, expected_level
+    ):
+        with override_settings(WATCHFILES={}):
             replaced_run_with_reloader(
                 lambda *args, **kwargs: None, verbosity=verbosity
             )
-            watchfiles_logger = logging.getLogger("watchfiles")
             assert watchfiles_logger.level == expected_level
 
-    def test_replaced_run_with_reloader_watch_filter_attribute_error(self):
-        """Test handling of watch_filter attribute error"""
-        mock_settings = mock.Mock()
-        mock_settings.USE_I18N = False
-        mock_settings.LOCALE_PATHS = []
-        mock_settings.WATCHFILES = {"watch_filter": "tests.filters.NonExistentFilter"}
-
-        def mock_run_with_reloader(*args, **kwargs):
-            args[0]()
-            return None
-
-        with (
-            mock.patch("django.conf.settings", mock_settings),
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
-            ),
-        ):
-            replaced_run_with_reloader(lambda: None)
-            reloader = autoreload.get_reloader()
-            assert "watch_filter" not in reloader.watchfiles_settings
-
-    def test_replaced_run_with_reloader_watch_filter_value_error(self):
-        """Test handling of watch_filter value error"""
-        mock_settings = mock.Mock()
-        mock_settings.USE_I18N = False
-        mock_settings.LOCALE_PATHS = []
-        mock_settings.WATCHFILES = {"watch_filter": "invalid:format:path"}
-
-        def mock_run_with_reloader(*args, **kwargs):
-            args[0]()
-            return None
-
-        with (
-            mock.patch("django.conf.settings", mock_settings),
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
-            ),
-        ):
-            replaced_run_with_reloader(lambda: None)
-            reloader = autoreload.get_reloader()
-            assert "watch_filter" not in reloader.watchfiles_settings
+    @pytest.mark.parametrize(
+        ("verbosity", "expected_level"),
+        [
+            pytest.param(0, logging.ERROR, id="error_level"),
+            pytest.param(1, logging.WARNING, id="warning_level"),
+            pytest.param(2, logging.INFO, id="info_level"),
+            pytest.param(3, logging.DEBUG, id="debug_level"),
+        ],
+    )
+    def test_replaced_run_with_reloader_no_debug(
+        self, watchfiles_logger, verbosity, expected_level
+    ):
+        """Test the log level calculation without debug mode"""
+        with override_settings(WATCHFILES={}):
+            replaced_run_with_reloader(
+                lambda *args, **kwargs: None, verbosity=verbosity
+            )
+            assert watchfiles_logger.level == expected_level
 
-    def test_replaced_run_with_reloader_watch_filter_not_callable(self):
-        """Test handling of watch_filter that exists but isn't callable"""
-        mock_settings = mock.Mock()
-        mock_settings.WATCHFILES = {
-            "watch_filter": "tests.filters.NOT_CALLABLE",
-            "debug": True,
-        }
-        mock_settings.LOCALE_PATHS = []
+    @pytest.mark.parametrize(
+        "patched_settings",
+        [settings_with_watchfiles({"watch_filter": "tests.filters.NOT_CALLABLE"})],
+        indirect=True,
+    )
+    def test_replaced_run_with_reloader_watch_filter_not_callable(
+        self, patched_settings, caplog
+    ):
+        replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
 
-        def mock_run_with_reloader(*args, **kwargs):
-            args[0]()
-            return 0
+        message = "watch_filter 'tests.filters.NOT_CALLABLE' is not callable"
+        assert message in caplog.text
 
-        with (
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
-            ),
-            mock.patch("django.conf.settings", mock_settings),
-        ):
+    @pytest.mark.parametrize(
+        "patched_settings",
+        [settings_with_watchfiles({"watch_filter": "tests.filters.raising_factory"})],
+        indirect=True,
+    )
+    def test_replaced_run_with_reloader_watch_filter_factory_error(
+        self, patched_settings
+    ):
+        """Test errors from a valid filter factory are not swallowed"""
+        with pytest.raises(TypeError, match="broken filter factory"):
             replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
-            reloader = autoreload.get_reloader()
-            self.assertNotIn("watch_filter", reloader.watchfiles_settings)
-
-    def test_replaced_run_with_reloader_settings_attribute_error(self):
-        """Test handling of AttributeError when accessing WATCHFILES"""
-        mock_settings = mock.Mock(spec=[])
-        mock_settings.LOCALE_PATHS = []
-        mock_settings.USE_I18N = None
-
-        def mock_run_with_reloader(*args, **kwargs):
-            return None
 
-        with (
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
+    @pytest.mark.parametrize(
+        ("patched_settings", "expected_settings"),
+        [
+            pytest.param(
+                settings_with_watchfiles(
+                    {"watch_filter": "tests.filters.NonExistentFilter"}
+                ),
+                {"debug": False},
+                id="watch_filter_missing_attribute",
             ),
-            mock.patch("django.conf.settings", mock_settings),
-        ):
-            replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
-            reloader = autoreload.get_reloader()
-            self.assertEqual(reloader.watchfiles_settings, {"debug": False})
-
-    def test_replaced_run_with_reloader_improperly_configured(self):
-        """Test handling of ImproperlyConfigured when accessing WATCHFILES"""
-
-        mock_settings = mock.Mock()
-        mock_settings.USE_I18N = False
-        mock_settings.LOCALE_PATHS = []
-        type(mock_settings).WATCHFILES = mock.PropertyMock(
-            side_effect=ImproperlyConfigured("Settings not configured")
-        )
-
-        def mock_run_with_reloader(*args, **kwargs):
-            args[0]()
-            return None
-
-        with (
-            mock.patch("django.conf.settings", mock_settings),
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
+            pytest.param(
+                settings_with_watchfiles({"watch_filter": "invalid:format:path"}),
+                {"debug": False},
+                id="watch_filter_invalid_format",
             ),
-        ):
-            replaced_run_with_reloader(lambda: None)
-            reloader = autoreload.get_reloader()
-            assert reloader.watchfiles_settings == {"debug": False}
-
-    def test_replaced_run_with_reloader_no_watchfiles_settings(self):
-        """Test handling when settings doesn't have WATCHFILES attribute"""
-        mock_settings = mock.Mock(spec=[])
-        mock_settings.LOCALE_PATHS = []
-        mock_settings.USE_I18N = None
-
-        def mock_run_with_reloader(*args, **kwargs):
-            return None
-
-        with (
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
+            pytest.param(
+                settings_with_watchfiles(
+                    {"watch_filter": "invalid.path.that.doesnt.exist", "debug": True}
+                ),
+                {"debug": True},
+                id="watch_filter_missing_module",
             ),
-            mock.patch("django.conf.settings", mock_settings),
-        ):
-            replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
-            reloader = autoreload.get_reloader()
-            self.assertEqual(reloader.watchfiles_settings, {"debug": False})
-
-    def test_replaced_run_with_reloader_invalid_watch_filter(self):
-        """Test handling when watch_filter setting is invalid"""
-        mock_settings = mock.Mock()
-        mock_settings.WATCHFILES = {
-            "watch_filter": "invalid.path.that.doesnt.exist",
-            "debug": True,
-        }
-        mock_settings.LOCALE_PATHS = []
-
-        def mock_run_with_reloader(*args, **kwargs):
-            args[0]()
-            return 0
-
-        with (
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
+            pytest.param(
+                settings_with_watchfiles(
+                    {"watch_filter": "tests.filters.NOT_CALLABLE", "debug": True}
+                ),
+                {"debug": True},
+                id="watch_filter_not_callable",
             ),
-            mock.patch("django.conf.settings", mock_settings),
-        ):
-            replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
-            reloader = autoreload.get_reloader()
-            self.assertNotIn("watch_filter", reloader.watchfiles_settings)
-
-    def test_replaced_run_with_reloader_watch_filter_import_error(self):
-        """Test handling of watch_filter import failure"""
-        mock_settings = mock.Mock()
-        mock_settings.WATCHFILES = {
-            "watch_filter": "tests.filters.DOES_NOT_EXIST",
-            "debug": True,
-        }
-        mock_settings.LOCALE_PATHS = []
-
-        with (
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", self.mock_run_with_reloader
+            pytest.param(
+                settings_without_watchfiles(),
+                {"debug": False},
+                id="no_watchfiles_setting",
             ),
-            mock.patch("django.conf.settings", mock_settings),
-        ):
-            replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
-            reloader = autoreload.get_reloader()
-            self.assertNotIn("watch_filter", reloader.watchfiles_settings)
-
-    def test_replaced_run_with_reloader_attribute_error(self):
-        """Test handling of AttributeError when accessing WATCHFILES"""
-        mock_settings = mock.Mock(spec=[])
-        mock_settings.USE_I18N = False
-        mock_settings.LOCALE_PATHS = []
-
-        def mock_run_with_reloader(*args, **kwargs):
-            args[0]()
-            return None
-
-        with (
-            mock.patch("django.conf.settings", mock_settings),
-            mock.patch(
-                "django.utils.autoreload.run_with_reloader", mock_run_with_reloader
+            pytest.param(
+                unconfigured_settings(),
+                {"debug": False},
+                id="improperly_configured",
             ),
-        ):
-            replaced_run_with_reloader(lambda: None)
-            reloader = autoreload.get_reloader()
-            assert reloader.watchfiles_settings == {"debug": False}
+        ],
+        indirect=["patched_settings"],
+    )
+    def test_replaced_run_with_reloader_settings_fallback(
+        self, patched_settings, expected_settings
+    ):
+        """Test settings that can't be used fall back to the defaults"""
+        replaced_run_with_reloader(lambda *args, **kwargs: None, verbosity=1)
+        reloader = autoreload.get_reloader()
+        assert reloader.watchfiles_settings == expected_settings
 
 
-class CustomFilterTests(SimpleTestCase):
-    def setUp(self):
-        temp_dir = self.enterContext(tempfile.TemporaryDirectory())
-        self.temp_path = Path(temp_dir)
-        self.src_dir = self.temp_path / "my_src"
-        self.src_dir.mkdir()
+@pytest.fixture(scope="class")
+def no_notify_file_changed():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            BaseReloader, "notify_file_changed", lambda self, path: None
+        )
+        yield
+
 
-        self._original_notify = BaseReloader.notify_file_changed
-        BaseReloader.notify_file_changed = lambda self, path: None
+@pytest.fixture(scope="class")
+def src_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("my_src")
 
-    def tearDown(self):
-        BaseReloader.notify_file_changed = self._original_notify
 
-    def wait_for_changes(self, watcher_iter, timeout=3.0, retry_count=5):
-        """Helper method to wait for changes with improved reliability"""
-        for attempt in range(retry_count):
-            start_time = time.time()
+@pytest.fixture(scope="class")
+def resolved_src_dir(src_dir):
+    return str(src_dir.resolve())
 
-            try:
-                while time.time() - start_time < timeout:
-                    if changes := next(watcher_iter):
-                        return changes
-                    time.sleep(0.2)
-            except StopIteration:
-                return None
 
-            # If we didn't get changes and have retries left, try again
-            if attempt < retry_count - 1:
-                time.sleep(1.0)
+@pytest.fixture(scope="class")
+def only_added_watcher_iter(src_dir):
+    """One watcher over src_dir, shared by every case in the class"""
+    watcher = MutableWatcher(only_added, {})
+    watcher.set_roots({src_dir})
+    watcher_iter = iter(watcher)
+    flush_initial_events(watcher_iter)
+    yield watcher_iter
+    watcher.stop()
 
-        return None
 
-    @parameterized.expand(
+@pytest.fixture
+def drained_watcher_iter(only_added_watcher_iter):
+    """The shared watcher, with events left over from earlier cases consumed"""
+    flush_initial_events(only_added_watcher_iter)
+    return only_added_watcher_iter
+
+
+@pytest.mark.usefixtures("no_notify_file_changed")
+class TestCustomFilter:
+    @pytest.mark.parametrize(
+        ("change", "expected"),
         [
-            ("js_file", "test.js", "console.log('watch!')"),
-            ("html_file", "test.html", "<h1>hello world!</h1>"),
-            ("css_file", "test.css", "body { color: blue; }"),
-        ]
+            pytest.param(Change.added, True, id="added"),
+            pytest.param(Change.modified, True, id="modified"),
+            pytest.param(Change.deleted, False, id="deleted"),
+        ],
     )
-    @pytest.mark.flaky(reruns=3, reruns_delay=1)
-    def test_only_added_filter_file_types(self, name, file_name, file_content):
-        watcher = MutableWatcher(only_added, {})
-        test_file = self.src_dir / file_name
-        watcher.set_roots({self.src_dir})
-        watcher_iter = iter(watcher)
+    def test_mask_filter_multiple_changes(self, change, expected):
+        mask_filter = make_mask_filter(Change.added, Change.modified)
 
-        try:
-            next(watcher_iter)
-            time.sleep(0.5)
+        assert mask_filter(change, "test.py") is expected
 
-            test_file.write_text(file_content)
-            changes = self.wait_for_changes(watcher_iter, timeout=3.0, retry_count=5)
-
-            self.assertIsNotNone(changes, f"No changes detected for {test_file}")
+    @pytest.mark.parametrize(
+        ("file_name", "file_content"),
+        [
+            pytest.param("test.js", "console.log('watch!')", id="js_file"),
+            pytest.param("test.html", "<h1>hello world!</h1>", id="html_file"),
+            pytest.param("test.css", "body { color: blue; }", id="css_file"),
+        ],
+    )
+    def test_only_added_filter_file_types(
+        self,
+        src_dir,
+        resolved_src_dir,
+        drained_watcher_iter,
+        file_name,
+        file_content,
+    ):
+        # Each case writes a different file and waits for that file's event,
+        # so they can share one watcher in any order.
+        test_file = src_dir / file_name
+        resolved_path = os.path.join(resolved_src_dir, file_name)
 
-            change_paths = [path for _, path in changes]
-            real_test_path = str(test_file.resolve())
-            self.assertIn(real_test_path, change_paths)
-            self.assertTrue(all(change == Change.added for change, _ in changes))
+        write_file(test_file, file_content)
+        changes = wait_for_change(drained_watcher_iter, (Change.added, resolved_path))
 
-        finally:
-            watcher.stop()
+        assert changes is not None, f"No changes detected for {test_file}"
+        assert all(change == Change.added for change, _ in changes)
 
         watchfiles_settings = {"watch_filter": only_added}
         reloader = WatchfilesReloader(watchfiles_settings)
 
-        # get both the regular and resolved paths
         regular_path = str(test_file)
-        resolved_path = str(test_file.resolve())
 
-        reloader.watch_dir(self.src_dir, "*.*")
+        reloader.watch_dir(src_dir, "*.*")
 
         # test file filter with both paths
         regular_result = reloader.file_filter(Change.added, regular_path)
 
-        self.assertTrue(
-            regular_result, f"File filter should accept regular path: {regular_path}"
-        )
+        assert regular_result, f"File filter should accept regular path: {regular_path}"
+
+        resolved_result = reloader.file_filter(Change.added, resolved_path)
 
-        reloader.file_filter(Change.added, resolved_path)
+        assert resolved_result, f"File filter should accept path: {resolved_path}"